@@ -3,14 +3,29 @@ Elite Health Command - Backend Server
 Flask API with ML Model Integration for Wearable Health Data Processing
 """
 import os
+
+# Gevent has to patch the standard library before anything else imports it.
+# sqlite3 can't be patched: shard writers commit through gevent's native
+# threadpool (see db_manager.run_blocking), while short indexed reads still
+# run on the event loop.
+if os.getenv("GEVENT"):
+    from gevent import monkey
+    monkey.patch_all()
+
 from dotenv import load_dotenv
-from flask import Flask, request, jsonify,redirect, session, jsonify
+from flask import Flask, Response, request, jsonify,redirect, session, jsonify
 from flask_cors import CORS
+from flask_compress import Compress
 from flask_socketio import SocketIO, emit
 import numpy as np
-from datetime import datetime
+from collections import deque
+import itertools
+import threading
 import sqlite3
 import json 
+import orjson
+from typing import Optional
+from pydantic import BaseModel, ConfigDict, ValidationError
 from google_auth_oauthlib.flow import Flow
 
 load_dotenv()
@@ -24,10 +39,40 @@ CLIENT_SECRET=os.getenv("GOOGLE_CLIENT_SECRET")
 app = Flask(__name__)
 app.config['SECRET_KEY'] = 'elite-health-command-secret-key-2026'
 CORS(app)  # Enable CORS for frontend communication
-socketio = SocketIO(app, cors_allowed_origins="*")
+
+# Compress larger JSON responses (history, alerts); CORS headers are preserved
+app.config['COMPRESS_ALGORITHM'] = ['br', 'gzip']
+app.config['COMPRESS_MIN_SIZE'] = 512
+Compress(app)
+
+
+class OrjsonCodec:
+    """orjson adapter exposing the json module interface Socket.IO expects"""
+    
+    @staticmethod
+    def dumps(obj, *args, **kwargs):
+        return orjson.dumps(obj).decode()
+    
+    loads = staticmethod(orjson.loads)
+
+
+socketio = SocketIO(
+    app,
+    cors_allowed_origins="*",
+    json=OrjsonCodec,
+    async_mode='gevent' if os.getenv("GEVENT") else None
+)
+
+
+def fast_jsonify(obj):
+    """Serialize obj to a JSON response with orjson"""
+    return Response(orjson.dumps(obj), mimetype='application/json')
+
+
+from utils.clock import now_iso
 
 # Import ML model (we'll create this next)
-from models.health_predictor import HealthPredictor
+from models.health_predictor import HealthPredictor, Vitals
 
 # Initialize ML model
 ml_model = HealthPredictor()
@@ -36,6 +81,62 @@ ml_model = HealthPredictor()
 from database.db_manager import DatabaseManager
 db = DatabaseManager()
 
+# ═══════════════════════════════════════════════════
+# WEBSOCKET BROADCAST BATCHING
+# ═══════════════════════════════════════════════════
+
+VITALS_BATCH_INTERVAL = 0.05  # Seconds between batched broadcasts
+VITALS_BATCH_MAX = 1024       # Pending updates kept before the oldest are dropped
+
+pending_vitals = deque(maxlen=VITALS_BATCH_MAX)
+pending_vitals_lock = threading.Lock()
+
+
+def queue_vitals_broadcast(data):
+    """Queue a vitals update for the next batched WebSocket broadcast"""
+    with pending_vitals_lock:
+        pending_vitals.append(data)
+
+
+def flush_loop():
+    """Broadcast queued vitals updates to all clients as a single frame"""
+    while True:
+        socketio.sleep(VITALS_BATCH_INTERVAL)
+        
+        if not pending_vitals:
+            continue
+        
+        with pending_vitals_lock:
+            batch = list(pending_vitals)
+            pending_vitals.clear()
+        
+        # A server-level emit without `to` already reaches every client
+        try:
+            socketio.emit('vitals_update_batch', batch)
+        except Exception as e:
+            print(f"❌ Error broadcasting vitals batch: {e}")
+
+
+socketio.start_background_task(flush_loop)
+
+# ═══════════════════════════════════════════════════
+# REQUEST SCHEMAS
+# ═══════════════════════════════════════════════════
+
+class VitalsIn(BaseModel):
+    """Vital signs payload posted by a wearable device"""
+    model_config = ConfigDict(allow_inf_nan=False)  # The risk kernels assume finite readings
+    
+    soldier_id: str
+    heart_rate: float
+    spo2: float
+    temperature: float
+    systolic: float = 120
+    diastolic: float = 80
+    altitude: float = 0
+    timestamp: Optional[str] = None
+
+
 # ═══════════════════════════════════════════════════
 # REST API ENDPOINTS
 # ═══════════════════════════════════════════════════
@@ -46,7 +147,7 @@ def health_check():
     return jsonify({
         'status': 'operational',
         'message': 'Elite Health Command API is running',
-        'timestamp': datetime.now().isoformat(),
+        'timestamp': now_iso(),
         'version': '1.0.0'
     }), 200
 
@@ -69,50 +170,53 @@ def receive_vitals():
     }
     """
     try:
-        data = request.get_json()
-        
-        # Validate required fields
-        required_fields = ['soldier_id', 'heart_rate', 'spo2', 'temperature']
-        for field in required_fields:
-            if field not in data:
-                return jsonify({'error': f'Missing required field: {field}'}), 400
+        # Validate and coerce fields
+        try:
+            payload = VitalsIn.model_validate(request.get_json())
+        except ValidationError as e:
+            return fast_jsonify({
+                'error': e.errors(include_url=False, include_context=False)
+            }), 400
         
         # Extract vitals
         vitals = {
-            'soldier_id': data['soldier_id'],
-            'heart_rate': float(data['heart_rate']),
-            'spo2': float(data['spo2']),
-            'temperature': float(data['temperature']),
-            'systolic': float(data.get('systolic', 120)),
-            'diastolic': float(data.get('diastolic', 80)),
-            'altitude': float(data.get('altitude', 0)),
-            'timestamp': data.get('timestamp', datetime.now().isoformat())
+            'soldier_id': payload.soldier_id,
+            'heart_rate': payload.heart_rate,
+            'spo2': payload.spo2,
+            'temperature': payload.temperature,
+            'systolic': payload.systolic,
+            'diastolic': payload.diastolic,
+            'altitude': payload.altitude,
+            'timestamp': payload.timestamp or now_iso()
         }
         
         # Process with ML model
-        ml_results = ml_model.predict(vitals)
+        ml_results = ml_model.predict(Vitals(
+            payload.heart_rate, payload.spo2, payload.temperature,
+            payload.systolic, payload.diastolic, payload.altitude
+        ))
         
         # Combine original data with ML predictions
         response_data = {
             **vitals,
-            'ml_analysis': ml_results,
-            'processed_at': datetime.now().isoformat()
+            'ml_analysis': ml_results.to_dict(),
+            'processed_at': now_iso()
         }
         
         # Store in database
         db.store_vitals(response_data)
         
-        # Broadcast to connected frontend clients via WebSocket
-        socketio.emit('vitals_update', response_data, broadcast=True)
+        # Queue for the next batched WebSocket broadcast
+        queue_vitals_broadcast(response_data)
         
-        return jsonify({
+        return fast_jsonify({
             'success': True,
             'data': response_data,
             'message': 'Vitals processed successfully'
         }), 200
         
     except Exception as e:
-        return jsonify({
+        return fast_jsonify({
             'success': False,
             'error': str(e)
         }), 500
@@ -125,18 +229,18 @@ def get_latest_vitals(soldier_id):
         vitals = db.get_latest_vitals(soldier_id)
         
         if vitals:
-            return jsonify({
+            return fast_jsonify({
                 'success': True,
                 'data': vitals
             }), 200
         else:
-            return jsonify({
+            return fast_jsonify({
                 'success': False,
                 'message': 'No data found for this soldier'
             }), 404
             
     except Exception as e:
-        return jsonify({
+        return fast_jsonify({
             'success': False,
             'error': str(e)
         }), 500
@@ -149,17 +253,20 @@ def get_vitals_history(soldier_id):
         # Get optional query parameters
         limit = request.args.get('limit', 100, type=int)
         hours = request.args.get('hours', 24, type=int)
+        include_analysis = request.args.get('analysis', 1, type=int) != 0
         
-        history = db.get_vitals_history(soldier_id, limit=limit, hours=hours)
+        history = db.get_vitals_history(
+            soldier_id, limit=limit, hours=hours, include_analysis=include_analysis
+        )
         
-        return jsonify({
+        return fast_jsonify({
             'success': True,
             'count': len(history),
             'data': history
         }), 200
         
     except Exception as e:
-        return jsonify({
+        return fast_jsonify({
             'success': False,
             'error': str(e)
         }), 500
@@ -186,13 +293,13 @@ def predict_risk():
         # Run ML prediction
         prediction = ml_model.predict_risk_level(data)
         
-        return jsonify({
+        return fast_jsonify({
             'success': True,
             'prediction': prediction
         }), 200
         
     except Exception as e:
-        return jsonify({
+        return fast_jsonify({
             'success': False,
             'error': str(e)
         }), 500
@@ -204,14 +311,14 @@ def get_alerts(soldier_id):
     try:
         alerts = db.get_active_alerts(soldier_id)
         
-        return jsonify({
+        return fast_jsonify({
             'success': True,
             'count': len(alerts),
             'alerts': alerts
         }), 200
         
     except Exception as e:
-        return jsonify({
+        return fast_jsonify({
             'success': False,
             'error': str(e)
         }), 500
@@ -228,7 +335,7 @@ def handle_connect():
     emit('connection_response', {
         'status': 'connected',
         'message': 'Connected to Elite Health Command server',
-        'timestamp': datetime.now().isoformat()
+        'timestamp': now_iso()
     })
 
 
@@ -242,7 +349,7 @@ def handle_disconnect():
 def handle_vitals_request(data):
     """Handle real-time vitals data request"""
     soldier_id = data.get('soldier_id', 'SOL-7842-ALPHA')
-    vitals = db.get_latest_vitals(soldier_id)
+    vitals = db.get_latest_vitals_minimal(soldier_id)
     
     if vitals:
         emit('vitals_data', vitals)
@@ -254,6 +361,18 @@ def handle_vitals_request(data):
 # SIMULATION ENDPOINT (For Testing)
 # ═══════════════════════════════════════════════════
 
+# Pre-generated pool of realistic random vitals, served round-robin
+SIM_POOL_SIZE = 1 << 16  # Must be a power of two
+
+_sim_rng = np.random.default_rng()
+_sim_heart_rate = _sim_rng.integers(60, 101, SIM_POOL_SIZE, dtype=np.int32)
+_sim_spo2 = _sim_rng.integers(92, 100, SIM_POOL_SIZE, dtype=np.int32)
+_sim_temperature = np.round(_sim_rng.uniform(36.1, 37.2, SIM_POOL_SIZE), 1)
+_sim_systolic = _sim_rng.integers(110, 131, SIM_POOL_SIZE, dtype=np.int32)
+_sim_diastolic = _sim_rng.integers(70, 86, SIM_POOL_SIZE, dtype=np.int32)
+_sim_index = itertools.count()
+
+
 @app.route('/api/simulate', methods=['POST'])
 def simulate_data():
     """
@@ -261,18 +380,18 @@ def simulate_data():
     Generates random but realistic vital signs
     """
     try:
-        import random
+        # Take the next realistic random vitals from the pool
+        i = next(_sim_index) & (SIM_POOL_SIZE - 1)
         
-        # Generate realistic random vitals
         simulated_data = {
             'soldier_id': 'SOL-7842-ALPHA',
-            'heart_rate': random.randint(60, 100),
-            'spo2': random.randint(92, 99),
-            'temperature': round(random.uniform(36.1, 37.2), 1),
-            'systolic': random.randint(110, 130),
-            'diastolic': random.randint(70, 85),
+            'heart_rate': int(_sim_heart_rate[i]),
+            'spo2': int(_sim_spo2[i]),
+            'temperature': float(_sim_temperature[i]),
+            'systolic': int(_sim_systolic[i]),
+            'diastolic': int(_sim_diastolic[i]),
             'altitude': 5400,
-            'timestamp': datetime.now().isoformat()
+            'timestamp': now_iso()
         }
         
         # Process through the same pipeline
@@ -280,22 +399,22 @@ def simulate_data():
         
         response_data = {
             **simulated_data,
-            'ml_analysis': ml_results,
-            'processed_at': datetime.now().isoformat()
+            'ml_analysis': ml_results.to_dict(),
+            'processed_at': now_iso()
         }
         
         # Store and broadcast
         db.store_vitals(response_data)
-        socketio.emit('vitals_update', response_data, broadcast=True)
+        queue_vitals_broadcast(response_data)
         
-        return jsonify({
+        return fast_jsonify({
             'success': True,
             'data': response_data,
             'message': 'Simulated data processed'
         }), 200
         
     except Exception as e:
-        return jsonify({
+        return fast_jsonify({
             'success': False,
             'error': str(e)
         }), 500
@@ -321,22 +440,25 @@ def internal_error(error):
     }), 500
 
 
-SCOPES = [
+SCOPES = (
     "https://www.googleapis.com/auth/fitness.heart_rate.read",
     "https://www.googleapis.com/auth/fitness.activity.read"
-]
+)
+
+# OAuth client config is fixed for the life of the process
+_GOOGLE_CLIENT_CONFIG = {
+    "web": {
+        "client_id": CLIENT_ID,
+        "client_secret": CLIENT_SECRET,
+        "auth_uri": "https://accounts.google.com/o/oauth2/auth",
+        "token_uri": "https://oauth2.googleapis.com/token",
+    }
+}
 
 @app.route("/google/login")
 def google_login():
     flow = Flow.from_client_config(
-        {
-            "web": {
-                "client_id": CLIENT_ID,
-                "client_secret": CLIENT_SECRET,
-                "auth_uri": "https://accounts.google.com/o/oauth2/auth",
-                "token_uri": "https://oauth2.googleapis.com/token",
-            }
-        },
+        _GOOGLE_CLIENT_CONFIG,
         scopes=SCOPES,
     )
 
@@ -355,14 +477,7 @@ def google_callback():
     state = session["state"]
 
     flow = Flow.from_client_config(
-        {
-            "web": {
-                "client_id": CLIENT_ID,
-                "client_secret": CLIENT_SECRET,
-                "auth_uri": "https://accounts.google.com/o/oauth2/auth",
-                "token_uri": "https://oauth2.googleapis.com/token",
-            }
-        },
+        _GOOGLE_CLIENT_CONFIG,
         scopes=SCOPES,
         state=state,
     )
@@ -380,17 +495,25 @@ def google_callback():
     return redirect("http://localhost:your_frontend_port/dashboard.html")
 
 import requests
+from requests.adapters import HTTPAdapter
+from functools import lru_cache
 import time
 
-@app.route("/google/heart")
-def get_heart_data():
-    credentials = session.get("credentials")
-    if not credentials:
-        return jsonify({"error": "User not logged in"}), 401
+# Keep TLS connections to googleapis.com alive between requests
+_google_session = requests.Session()
+_google_session.mount("https://", HTTPAdapter(pool_connections=4, pool_maxsize=32))
 
-    access_token = credentials["token"]
 
-    end_time = int(time.time() * 1000)
+@lru_cache(maxsize=32)
+def _fetch_heart_data(access_token, end_minute):
+    """
+    Fetch the hour of heart rate buckets ending at end_minute
+    
+    Cached per (token, minute) so dashboard polls within the same
+    1-minute bucket share one upstream request. Error responses raise
+    requests.HTTPError so they are never cached.
+    """
+    end_time = end_minute * 60000
     start_time = end_time - 3600000  # last 1 hour
 
     url = "https://www.googleapis.com/fitness/v1/users/me/dataset:aggregate"
@@ -408,9 +531,27 @@ def get_heart_data():
         "Authorization": f"Bearer {access_token}"
     }
 
-    response = requests.post(url, json=body, headers=headers)
+    response = _google_session.post(url, json=body, headers=headers, timeout=5)
+    response.raise_for_status()
+
+    return response.json()
 
-    return jsonify(response.json())
+
+@app.route("/google/heart")
+def get_heart_data():
+    credentials = session.get("credentials")
+    if not credentials:
+        return jsonify({"error": "User not logged in"}), 401
+
+    access_token = credentials["token"]
+
+    end_minute = int(time.time() * 1000) // 60000
+
+    try:
+        return jsonify(_fetch_heart_data(access_token, end_minute))
+    except requests.HTTPError as e:
+        # Pass Google's error (expired token, quota) through uncached
+        return e.response.content, e.response.status_code, {'Content-Type': 'application/json'}
 
 
 # ═══════════════════════════════════════════════════
@@ -5,9 +5,178 @@ Handles storage and retrieval of vital signs and health data
 
 import sqlite3
 import json
+import orjson
+import queue
+import threading
+import time
+import atexit
+import contextlib
+import zlib
 from datetime import datetime, timedelta
 import os
 
+from utils.clock import now_iso
+
+try:
+    from gevent import monkey as gevent_monkey
+except ImportError:  # gevent is only used by the production server
+    gevent_monkey = None
+
+
+# Vitals are sharded by soldier across attached databases. SQLite attaches
+# at most 10 databases by default, so the shard count stays below that.
+VITALS_SHARDS = 8
+SHARD_SCHEMAS = tuple(f's{n}' for n in range(VITALS_SHARDS))
+
+# Idle read connections kept open for reuse; bursts beyond this open extra
+# connections that are closed after use
+CONNECTION_POOL_SIZE = 8
+
+# Write-behind batching: each shard's writer thread commits once per batch
+WRITE_BATCH_SIZE = 256       # Maximum rows per transaction
+WRITE_FLUSH_INTERVAL = 0.1   # Seconds to wait for a batch to fill
+
+# Column order of the vitals INSERT parameters
+VITALS_COLUMNS = (
+    'soldier_id', 'heart_rate', 'spo2', 'temperature',
+    'systolic', 'diastolic', 'altitude',
+    'health_score', 'risk_level', 'risk_percentage',
+    'ml_analysis', 'timestamp', 'created_at'
+)
+
+# Fields of the latest vitals pushed to real-time dashboards
+LATEST_VITALS_FIELDS = (
+    'heart_rate', 'spo2', 'temperature', 'systolic', 'diastolic', 'altitude',
+    'timestamp', 'risk_level', 'risk_percentage', 'health_score'
+)
+
+# Risk levels are stored as their index in this tuple
+RISK_LEVELS = ('low', 'moderate', 'high', 'critical')
+RISK_LEVEL_CODES = {level: code for code, level in enumerate(RISK_LEVELS)}
+
+# Risk level columns that older databases stored as TEXT
+LEGACY_ENUM_COLUMNS = {'vitals': 'risk_level', 'alerts': 'severity'}
+
+
+def vitals_shard(soldier_id):
+    """Shard index for a soldier - stable across processes, unlike hash()"""
+    return zlib.crc32(soldier_id.encode()) % VITALS_SHARDS
+
+
+def run_blocking(func, *args):
+    """
+    Call func(*args), on a native thread when gevent has patched threading
+    
+    sqlite3 is a C extension that monkey-patching can't make cooperative, so
+    under gevent a commit would otherwise stall the worker's whole event loop.
+    """
+    if gevent_monkey is not None and gevent_monkey.is_module_patched('threading'):
+        import gevent
+        return gevent.get_hub().threadpool.apply(func, args)
+    return func(*args)
+
+
+def _per_shard(template, **fields):
+    """Expand a vitals statement template into a tuple indexed by shard"""
+    return tuple(
+        template.format(vitals=f'{schema}.vitals', **fields)
+        for schema in SHARD_SCHEMAS
+    )
+
+
+# ═══════════════════════════════════════════════════
+# SQL STATEMENTS
+# ═══════════════════════════════════════════════════
+
+# Vitals statements are tuples indexed by shard
+
+INSERT_VITALS_SQL = _per_shard(
+    'INSERT INTO {vitals} ({columns}) VALUES ({params})',
+    columns=', '.join(VITALS_COLUMNS),
+    params=', '.join('?' * len(VITALS_COLUMNS))
+)
+
+# Same columns as the cached latest row built by the writers (no id)
+SELECT_LATEST_VITALS_SQL = _per_shard('''
+    SELECT {columns} FROM {vitals}
+    WHERE soldier_id = ?
+    ORDER BY timestamp DESC
+    LIMIT 1
+''', columns=', '.join(VITALS_COLUMNS))
+
+SELECT_VITALS_HISTORY_SQL = _per_shard('''
+    SELECT * FROM {vitals}
+    WHERE soldier_id = ? AND timestamp >= ?
+    ORDER BY timestamp DESC
+    LIMIT ?
+''')
+
+# Served from idx_vitals_cover without touching the table
+SELECT_LATEST_MINIMAL_SQL = _per_shard('''
+    SELECT {columns}
+    FROM {vitals}
+    WHERE soldier_id = ?
+    ORDER BY timestamp DESC
+    LIMIT 1
+''', columns=', '.join(LATEST_VITALS_FIELDS))
+
+# Same as SELECT_VITALS_HISTORY_SQL minus ml_analysis, served from idx_vitals_cover
+SELECT_VITALS_SUMMARY_SQL = _per_shard('''
+    SELECT
+        id, soldier_id, heart_rate, spo2, temperature,
+        systolic, diastolic, altitude,
+        health_score, risk_level, risk_percentage, timestamp
+    FROM {vitals}
+    WHERE soldier_id = ? AND timestamp >= ?
+    ORDER BY timestamp DESC
+    LIMIT ?
+''')
+
+# Inserts only if no similar unacknowledged alert exists since the cutoff
+INSERT_ALERT_SQL = '''
+    INSERT INTO alerts (
+        soldier_id, alert_type, severity, message,
+        vitals_snapshot, created_at
+    )
+    SELECT ?, ?, ?, ?, ?, ?
+    WHERE NOT EXISTS (
+        SELECT 1 FROM alerts
+        WHERE soldier_id = ?
+        AND severity = ?
+        AND acknowledged = 0
+        AND created_at >= ?
+    )
+'''
+
+SELECT_ACTIVE_ALERTS_SQL = '''
+    SELECT * FROM alerts
+    WHERE soldier_id = ? AND acknowledged = 0
+    ORDER BY created_at DESC
+'''
+
+ACKNOWLEDGE_ALERT_SQL = '''
+    UPDATE alerts
+    SET acknowledged = 1, acknowledged_at = ?
+    WHERE id = ?
+'''
+
+# Answered from idx_vitals_cover; the cutoff is computed by SQLite in the same
+# local ISO-8601 format as the stored timestamps, given a '-<hours>' offset
+SELECT_STATISTICS_SQL = _per_shard('''
+    SELECT
+        COUNT(*) as record_count,
+        AVG(heart_rate) as avg_heart_rate,
+        MIN(heart_rate) as min_heart_rate,
+        MAX(heart_rate) as max_heart_rate,
+        AVG(spo2) as avg_spo2,
+        MIN(spo2) as min_spo2,
+        AVG(temperature) as avg_temperature,
+        AVG(health_score) as avg_health_score
+    FROM {vitals}
+    WHERE soldier_id = ?
+    AND timestamp >= strftime('%Y-%m-%dT%H:%M:%f', 'now', 'localtime', ? || ' hours')
+''')
+
 
 class DatabaseManager:
     """Manages SQLite database for health monitoring data"""
@@ -16,87 +185,251 @@ class DatabaseManager:
         """Initialize database connection and create tables"""
         self.db_path = db_path
         
-        # Create database directory if it doesn't exist
-        os.makedirs(os.path.dirname(db_path), exist_ok=True)
+        # Vitals shards live next to the main database
+        shard_dir = os.path.join(os.path.dirname(db_path), 'shards')
+        self._shard_paths = tuple(
+            os.path.join(shard_dir, f'{schema}.db') for schema in SHARD_SCHEMAS
+        )
+        
+        # Create database directories if they don't exist
+        os.makedirs(shard_dir, exist_ok=True)
         
-        self.conn = sqlite3.connect(db_path, check_same_thread=False)
-        self.conn.row_factory = sqlite3.Row  # Return rows as dictionaries
-        self.cursor = self.conn.cursor()
+        # Connections are reused across requests - opening one attaches every shard
+        self._pool = queue.LifoQueue(maxsize=CONNECTION_POOL_SIZE)
         
         self._create_tables()
+        
+        # Latest vitals per soldier, kept current by the writers as rows commit
+        self._latest = {}
+        self._latest_lock = threading.Lock()
+        
+        # Vitals are written in batches by one background thread per shard
+        self._write_qs = tuple(queue.Queue() for _ in SHARD_SCHEMAS)
+        self._writers = tuple(
+            threading.Thread(
+                target=self._writer_loop, args=(shard,),
+                name=f'vitals-writer-{shard}', daemon=True
+            )
+            for shard in range(VITALS_SHARDS)
+        )
+        for writer in self._writers:
+            writer.start()
+        atexit.register(self.flush)
+        
         print(f"✅ Database initialized: {db_path}")
     
     
+    def _connect(self):
+        """Open a new connection with every shard attached, all in WAL mode"""
+        conn = sqlite3.connect(
+            self.db_path, check_same_thread=False, cached_statements=256
+        )
+        conn.row_factory = sqlite3.Row  # Return rows as dictionaries
+        
+        for schema, path in zip(SHARD_SCHEMAS, self._shard_paths):
+            conn.execute(f"ATTACH DATABASE ? AS {schema}", (path,))
+        
+        for schema in ('main',) + SHARD_SCHEMAS:
+            conn.execute(f"PRAGMA {schema}.journal_mode=WAL")
+            conn.execute(f"PRAGMA {schema}.synchronous=NORMAL")
+        
+        return conn
+    
+    
+    @contextlib.contextmanager
+    def _connection(self):
+        """Check a connection out of the pool, opening one if none is idle"""
+        try:
+            conn = self._pool.get_nowait()
+        except queue.Empty:
+            conn = self._connect()
+        
+        try:
+            yield conn
+        finally:
+            # Never hand the next caller a half-finished transaction
+            if conn.in_transaction:
+                conn.rollback()
+            try:
+                self._pool.put_nowait(conn)
+            except queue.Full:
+                conn.close()
+    
+    
     def _create_tables(self):
         """Create database tables if they don't exist"""
+        with self._connection() as conn:
+            cursor = conn.cursor()
+            
+            # sqlite3 autocommits DDL, so the whole migration runs in one explicit
+            # transaction - a failure leaves the old tables exactly as they were
+            cursor.execute('BEGIN')
+            
+            legacy_tables = self._rename_legacy_tables(cursor)
+            
+            # Vitals tables - one per shard, stores all vital signs data
+            for schema in SHARD_SCHEMAS:
+                cursor.execute(f'''
+                    CREATE TABLE IF NOT EXISTS {schema}.vitals (
+                        id INTEGER PRIMARY KEY AUTOINCREMENT,
+                        soldier_id TEXT NOT NULL,
+                        heart_rate REAL,
+                        spo2 REAL,
+                        temperature REAL,
+                        systolic REAL,
+                        diastolic REAL,
+                        altitude REAL,
+                        health_score REAL,
+                        risk_level INTEGER,
+                        risk_percentage REAL,
+                        ml_analysis BLOB,
+                        timestamp TEXT NOT NULL,
+                        created_at TEXT NOT NULL
+                    )
+                ''')
+            
+            # Alerts table - stores generated alerts
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS alerts (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    soldier_id TEXT NOT NULL,
+                    alert_type TEXT NOT NULL,
+                    severity INTEGER NOT NULL,
+                    message TEXT,
+                    vitals_snapshot BLOB,
+                    acknowledged INTEGER DEFAULT 0,
+                    acknowledged_at TEXT,
+                    created_at TEXT NOT NULL
+                )
+            ''')
+            
+            if legacy_tables:
+                self._copy_legacy_rows(cursor, legacy_tables)
+            
+            # Create indexes for faster queries
+            # Covering index - history and latest lookups never touch the table
+            # unless ml_analysis is requested
+            for schema in SHARD_SCHEMAS:
+                cursor.execute(f'''
+                    CREATE INDEX IF NOT EXISTS {schema}.idx_vitals_cover
+                    ON vitals(
+                        soldier_id, timestamp DESC,
+                        heart_rate, spo2, temperature, systolic, diastolic, altitude,
+                        health_score, risk_level, risk_percentage
+                    )
+                ''')
+            
+            cursor.execute('''
+                CREATE INDEX IF NOT EXISTS idx_alerts_soldier 
+                ON alerts(soldier_id, created_at DESC)
+            ''')
+            
+            # Partial index for the duplicate-alert check on unacknowledged alerts
+            cursor.execute('''
+                CREATE INDEX IF NOT EXISTS idx_alerts_unacked
+                ON alerts(soldier_id, severity, created_at)
+                WHERE acknowledged = 0
+            ''')
+            
+            conn.commit()
+    
+    
+    def _rename_legacy_tables(self, cursor):
+        """
+        Move aside main-database tables that have to be rebuilt
         
-        # Vitals table - stores all vital signs data
-        self.cursor.execute('''
-            CREATE TABLE IF NOT EXISTS vitals (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                soldier_id TEXT NOT NULL,
-                heart_rate REAL,
-                spo2 REAL,
-                temperature REAL,
-                systolic REAL,
-                diastolic REAL,
-                altitude REAL,
-                health_score REAL,
-                risk_level TEXT,
-                risk_percentage REAL,
-                ml_analysis TEXT,
-                timestamp TEXT NOT NULL,
-                created_at TEXT NOT NULL
-            )
-        ''')
-        
-        # Alerts table - stores generated alerts
-        self.cursor.execute('''
-            CREATE TABLE IF NOT EXISTS alerts (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                soldier_id TEXT NOT NULL,
-                alert_type TEXT NOT NULL,
-                severity TEXT NOT NULL,
-                message TEXT,
-                vitals_snapshot TEXT,
-                acknowledged BOOLEAN DEFAULT 0,
-                acknowledged_at TEXT,
-                created_at TEXT NOT NULL
-            )
-        ''')
+        That is any table storing risk levels as TEXT, plus the unsharded
+        vitals table of older databases. A *_legacy table left behind by an
+        interrupted migration is picked up again instead.
         
-        # Create indexes for faster queries
-        self.cursor.execute('''
-            CREATE INDEX IF NOT EXISTS idx_soldier_timestamp 
-            ON vitals(soldier_id, timestamp DESC)
-        ''')
+        Returns:
+            dict: Legacy table -> whether its risk level column is TEXT
+        """
+        renamed = {}
         
-        self.cursor.execute('''
-            CREATE INDEX IF NOT EXISTS idx_alerts_soldier 
-            ON alerts(soldier_id, created_at DESC)
-        ''')
+        for table, column in LEGACY_ENUM_COLUMNS.items():
+            cursor.execute(f'PRAGMA main.table_info({table}_legacy)')
+            legacy_types = {row['name']: row['type'] for row in cursor.fetchall()}
+            
+            if legacy_types:
+                renamed[table] = legacy_types.get(column) == 'TEXT'
+                continue
+            
+            cursor.execute(f'PRAGMA main.table_info({table})')
+            column_types = {row['name']: row['type'] for row in cursor.fetchall()}
+            
+            text_levels = column_types.get(column) == 'TEXT'
+            unsharded = table == 'vitals' and bool(column_types)
+            
+            if text_levels or unsharded:
+                cursor.execute(f'ALTER TABLE main.{table} RENAME TO {table}_legacy')
+                renamed[table] = text_levels
         
-        self.conn.commit()
+        return renamed
+    
+    
+    def _copy_legacy_rows(self, cursor, tables):
+        """
+        Copy rows out of renamed legacy tables into their current homes
+        
+        Rows keep their ids and already-copied ids are skipped, so the copy can
+        be repeated safely (shard files commit individually under WAL). Any other
+        constraint failure aborts the migration rather than dropping rows.
+        """
+        cursor.connection.create_function('vitals_shard', 1, vitals_shard, deterministic=True)
+        
+        level_case = 'CASE {} ' + ' '.join(
+            f"WHEN '{level}' THEN {code}" for level, code in RISK_LEVEL_CODES.items()
+        ) + ' END'
+        
+        for table, text_levels in tables.items():
+            cursor.execute(f'PRAGMA main.table_info({table}_legacy)')
+            columns = [row['name'] for row in cursor.fetchall()]
+            enum_column = LEGACY_ENUM_COLUMNS[table]
+            
+            column_list = ', '.join(columns)
+            select = ', '.join(
+                level_case.format(column) if text_levels and column == enum_column else column
+                for column in columns
+            )
+            
+            if table == 'vitals':
+                # Route each soldier's rows to their shard. Under WAL each shard
+                # file commits on its own, so if the main commit is lost the next
+                # start finds vitals_legacy again and re-runs this copy
+                for shard, schema in enumerate(SHARD_SCHEMAS):
+                    cursor.execute(
+                        f'INSERT INTO {schema}.vitals ({column_list}) '
+                        f'SELECT {select} FROM main.vitals_legacy '
+                        f'WHERE vitals_shard(soldier_id) = ? '
+                        f'ON CONFLICT(id) DO NOTHING', (shard,)
+                    )
+            else:
+                cursor.execute(
+                    f'INSERT INTO main.{table} ({column_list}) '
+                    f'SELECT {select} FROM main.{table}_legacy '
+                    f'WHERE true ON CONFLICT(id) DO NOTHING'
+                )
+            
+            cursor.execute(f'DROP TABLE main.{table}_legacy')
+            print(f"✅ Migrated legacy {table} table")
     
     
     def store_vitals(self, data):
         """
-        Store vital signs data with ML analysis results
+        Queue vital signs data with ML analysis results for storage
+        
+        The row is committed asynchronously by its shard's writer thread; use
+        flush() to wait for pending writes.
         
         Args:
             data (dict): Complete vitals data with ML analysis
         """
         try:
             ml_analysis = data.get('ml_analysis', {})
+            risk_level = ml_analysis.get('overall_risk_level')
             
-            self.cursor.execute('''
-                INSERT INTO vitals (
-                    soldier_id, heart_rate, spo2, temperature,
-                    systolic, diastolic, altitude,
-                    health_score, risk_level, risk_percentage,
-                    ml_analysis, timestamp, created_at
-                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-            ''', (
+            params = (
                 data.get('soldier_id'),
                 data.get('heart_rate'),
                 data.get('spo2'),
@@ -105,48 +438,157 @@ class DatabaseManager:
                 data.get('diastolic'),
                 data.get('altitude'),
                 ml_analysis.get('health_score'),
-                ml_analysis.get('overall_risk_level'),
+                RISK_LEVEL_CODES.get(risk_level),
                 ml_analysis.get('overall_risk_percentage'),
-                json.dumps(ml_analysis),
+                orjson.dumps(ml_analysis),
                 data.get('timestamp'),
-                datetime.now().isoformat()
-            ))
+                now_iso()
+            )
             
-            self.conn.commit()
+            self._write_qs[vitals_shard(params[0])].put((params, data, ml_analysis))
             
-            # Check if alert should be generated
-            self._check_and_create_alert(data, ml_analysis)
+            return True
+            
+        except Exception as e:
+            print(f"Error storing vitals: {e}")
+            return False
+    
+    
+    def flush(self):
+        """Block until all queued vitals have been committed"""
+        for write_q in self._write_qs:
+            write_q.join()
+    
+    
+    def _writer_loop(self, shard):
+        """Drain a shard's write queue and commit its vitals in batches"""
+        write_q = self._write_qs[shard]
+        
+        # SQLite connections are thread-affine, so the writer owns its own
+        conn = self._connect()
+        
+        running = True
+        while running:
+            item = write_q.get()
+            if item is None:
+                write_q.task_done()
+                break
+            
+            batch = [item]
+            deadline = time.monotonic() + WRITE_FLUSH_INTERVAL
+            
+            while len(batch) < WRITE_BATCH_SIZE:
+                timeout = deadline - time.monotonic()
+                if timeout <= 0:
+                    break
+                try:
+                    item = write_q.get(timeout=timeout)
+                except queue.Empty:
+                    break
+                if item is None:
+                    running = False
+                    write_q.task_done()
+                    break
+                batch.append(item)
+            
+            if run_blocking(self._write_batch, conn, shard, batch):
+                # Only committed rows become a soldier's cached latest vitals
+                for params, _, ml_analysis in batch:
+                    latest = dict(zip(VITALS_COLUMNS, params))
+                    latest['risk_level'] = ml_analysis.get('overall_risk_level')
+                    latest['ml_analysis'] = ml_analysis
+                    self._cache_latest(latest)
+            for _ in batch:
+                write_q.task_done()
+        
+        conn.close()
+    
+    
+    def _write_batch(self, conn, shard, batch):
+        """
+        Insert a batch of vitals and their alerts in one transaction
+        
+        Returns:
+            bool: True if the batch was committed
+        """
+        try:
+            with conn:
+                cursor = conn.cursor()
+                cursor.executemany(INSERT_VITALS_SQL[shard], [params for params, _, _ in batch])
+                
+                # Check if alerts should be generated
+                for _, data, ml_analysis in batch:
+                    self._check_and_create_alert(cursor, data, ml_analysis)
             
             return True
             
         except Exception as e:
             print(f"Error storing vitals: {e}")
-            self.conn.rollback()
             return False
     
     
     def get_latest_vitals(self, soldier_id):
         """Get the most recent vitals for a soldier"""
+        latest = self._latest.get(soldier_id)
+        if latest is not None:
+            return latest
+        
         try:
-            self.cursor.execute('''
-                SELECT * FROM vitals
-                WHERE soldier_id = ?
-                ORDER BY timestamp DESC
-                LIMIT 1
-            ''', (soldier_id,))
-            
-            row = self.cursor.fetchone()
-            
-            if row:
-                return self._row_to_dict(row)
+            with self._connection() as conn:
+                cursor = conn.cursor()
+                
+                cursor.execute(SELECT_LATEST_VITALS_SQL[vitals_shard(soldier_id)], (soldier_id,))
+                
+                row = cursor.fetchone()
+                
+                if row:
+                    return self._cache_latest(self._row_to_dict_vitals(row))
+                return None
+                
+        except Exception as e:
+            print(f"Error getting latest vitals: {e}")
             return None
-            
+    
+    
+    def get_latest_vitals_minimal(self, soldier_id):
+        """Get only the dashboard fields of a soldier's most recent vitals"""
+        latest = self._latest.get(soldier_id)
+        if latest is not None:
+            return {field: latest[field] for field in LATEST_VITALS_FIELDS}
+        
+        try:
+            with self._connection() as conn:
+                cursor = conn.cursor()
+                
+                cursor.execute(SELECT_LATEST_MINIMAL_SQL[vitals_shard(soldier_id)], (soldier_id,))
+                
+                row = cursor.fetchone()
+                if row is None:
+                    return None
+                
+                result = dict(zip(LATEST_VITALS_FIELDS, row))
+                if result['risk_level'] is not None:
+                    result['risk_level'] = RISK_LEVELS[result['risk_level']]
+                return result
+                
         except Exception as e:
             print(f"Error getting latest vitals: {e}")
             return None
     
     
-    def get_vitals_history(self, soldier_id, limit=100, hours=24):
+    def _cache_latest(self, vitals):
+        """Remember vitals as a soldier's latest unless a newer row is cached"""
+        soldier_id = vitals['soldier_id']
+        
+        with self._latest_lock:
+            cached = self._latest.get(soldier_id)
+            if cached is None or (vitals['timestamp'] or '') >= (cached['timestamp'] or ''):
+                self._latest[soldier_id] = vitals
+                return vitals
+            return cached
+    
+    
+    def get_vitals_history(self, soldier_id, limit=100, hours=24, include_analysis=True):
         """
         Get historical vitals for a soldier
         
@@ -154,87 +596,79 @@ class DatabaseManager:
             soldier_id (str): Soldier ID
             limit (int): Maximum number of records to return
             hours (int): Number of hours to look back
+            include_analysis (bool): Include the full ml_analysis of each record
         """
         try:
-            cutoff_time = (datetime.now() - timedelta(hours=hours)).isoformat()
-            
-            self.cursor.execute('''
-                SELECT * FROM vitals
-                WHERE soldier_id = ? AND timestamp >= ?
-                ORDER BY timestamp DESC
-                LIMIT ?
-            ''', (soldier_id, cutoff_time, limit))
-            
-            rows = self.cursor.fetchall()
-            return [self._row_to_dict(row) for row in rows]
-            
+            with self._connection() as conn:
+                cursor = conn.cursor()
+                
+                cutoff_time = (datetime.now() - timedelta(hours=hours)).isoformat()
+                
+                sql = SELECT_VITALS_HISTORY_SQL if include_analysis else SELECT_VITALS_SUMMARY_SQL
+                cursor.execute(sql[vitals_shard(soldier_id)], (soldier_id, cutoff_time, limit))
+                
+                rows = cursor.fetchall()
+                return [self._row_to_dict_vitals(row) for row in rows]
+                
         except Exception as e:
             print(f"Error getting vitals history: {e}")
             return []
     
     
-    def _check_and_create_alert(self, data, ml_analysis):
-        """Check if vitals warrant an alert and create it"""
+    def _check_and_create_alert(self, cursor, data, ml_analysis):
+        """
+        Create an alert if vitals warrant one
+        
+        Returns:
+            bool: True if a new alert was inserted
+        """
         risk_level = ml_analysis.get('overall_risk_level', 'low')
         
         # Only create alerts for high or critical risk
-        if risk_level in ['high', 'critical']:
-            
-            # Check if similar alert already exists in last 10 minutes
-            ten_min_ago = (datetime.now() - timedelta(minutes=10)).isoformat()
-            
-            self.cursor.execute('''
-                SELECT COUNT(*) FROM alerts
-                WHERE soldier_id = ? 
-                AND severity = ?
-                AND acknowledged = 0
-                AND created_at >= ?
-            ''', (data.get('soldier_id'), risk_level, ten_min_ago))
-            
-            existing_count = self.cursor.fetchone()[0]
-            
-            # Don't create duplicate alerts
-            if existing_count > 0:
-                return
-            
-            # Get top risk
-            recommendations = ml_analysis.get('recommendations', [])
-            message = recommendations[0]['action'] if recommendations else 'Health risk detected'
-            
-            self.cursor.execute('''
-                INSERT INTO alerts (
-                    soldier_id, alert_type, severity, message,
-                    vitals_snapshot, created_at
-                ) VALUES (?, ?, ?, ?, ?, ?)
-            ''', (
-                data.get('soldier_id'),
-                'HEALTH_RISK',
-                risk_level,
-                message,
-                json.dumps({
-                    'heart_rate': data.get('heart_rate'),
-                    'spo2': data.get('spo2'),
-                    'temperature': data.get('temperature'),
-                    'risk_percentage': ml_analysis.get('overall_risk_percentage')
-                }),
-                datetime.now().isoformat()
-            ))
-            
-            self.conn.commit()
+        if risk_level not in ('high', 'critical'):
+            return False
+        
+        soldier_id = data.get('soldier_id')
+        severity = RISK_LEVEL_CODES[risk_level]
+        
+        # Similar unacknowledged alerts from the last 10 minutes suppress the insert
+        ten_min_ago = (datetime.now() - timedelta(minutes=10)).isoformat()
+        
+        # Get top risk
+        recommendations = ml_analysis.get('recommendations', [])
+        message = recommendations[0]['action'] if recommendations else 'Health risk detected'
+        
+        cursor.execute(INSERT_ALERT_SQL, (
+            soldier_id,
+            'HEALTH_RISK',
+            severity,
+            message,
+            orjson.dumps({
+                'heart_rate': data.get('heart_rate'),
+                'spo2': data.get('spo2'),
+                'temperature': data.get('temperature'),
+                'risk_percentage': ml_analysis.get('overall_risk_percentage')
+            }),
+            datetime.now().isoformat(),  # Uncached - alerts are ordered by created_at
+            soldier_id,
+            severity,
+            ten_min_ago
+        ))
+        
+        return cursor.rowcount > 0
     
     
     def get_active_alerts(self, soldier_id):
         """Get unacknowledged alerts for a soldier"""
         try:
-            self.cursor.execute('''
-                SELECT * FROM alerts
-                WHERE soldier_id = ? AND acknowledged = 0
-                ORDER BY created_at DESC
-            ''', (soldier_id,))
-            
-            rows = self.cursor.fetchall()
-            return [self._row_to_dict(row) for row in rows]
-            
+            with self._connection() as conn:
+                cursor = conn.cursor()
+                
+                cursor.execute(SELECT_ACTIVE_ALERTS_SQL, (soldier_id,))
+                
+                rows = cursor.fetchall()
+                return [self._row_to_dict_alert(row) for row in rows]
+                
         except Exception as e:
             print(f"Error getting alerts: {e}")
             return []
@@ -243,15 +677,14 @@ class DatabaseManager:
     def acknowledge_alert(self, alert_id):
         """Mark an alert as acknowledged"""
         try:
-            self.cursor.execute('''
-                UPDATE alerts
-                SET acknowledged = 1, acknowledged_at = ?
-                WHERE id = ?
-            ''', (datetime.now().isoformat(), alert_id))
-            
-            self.conn.commit()
-            return True
-            
+            with self._connection() as conn:
+                cursor = conn.cursor()
+                
+                cursor.execute(ACKNOWLEDGE_ALERT_SQL, (now_iso(), alert_id))
+                
+                conn.commit()
+                return True
+                
         except Exception as e:
             print(f"Error acknowledging alert: {e}")
             return False
@@ -260,56 +693,70 @@ class DatabaseManager:
     def get_statistics(self, soldier_id, hours=24):
         """Get statistical summary of vitals"""
         try:
-            cutoff_time = (datetime.now() - timedelta(hours=hours)).isoformat()
-            
-            self.cursor.execute('''
-                SELECT 
-                    COUNT(*) as record_count,
-                    AVG(heart_rate) as avg_heart_rate,
-                    MIN(heart_rate) as min_heart_rate,
-                    MAX(heart_rate) as max_heart_rate,
-                    AVG(spo2) as avg_spo2,
-                    MIN(spo2) as min_spo2,
-                    AVG(temperature) as avg_temperature,
-                    AVG(health_score) as avg_health_score
-                FROM vitals
-                WHERE soldier_id = ? AND timestamp >= ?
-            ''', (soldier_id, cutoff_time))
-            
-            row = self.cursor.fetchone()
-            return self._row_to_dict(row) if row else {}
-            
+            with self._connection() as conn:
+                cursor = conn.cursor()
+                
+                cursor.execute(SELECT_STATISTICS_SQL[vitals_shard(soldier_id)], (soldier_id, -hours))
+                
+                row = cursor.fetchone()
+                return self._row_to_dict_plain(row) if row else {}
+                
         except Exception as e:
             print(f"Error getting statistics: {e}")
             return {}
     
     
-    def _row_to_dict(self, row):
-        """Convert SQLite Row to dictionary"""
-        if not row:
-            return None
-            
+    def _row_to_dict_plain(self, row):
+        """Convert a SQLite Row without encoded fields to a dictionary"""
+        return dict(row)
+    
+    
+    def _row_to_dict_vitals(self, row):
+        """Convert a vitals Row to a dictionary, decoding risk level and ml_analysis"""
         result = dict(row)
         
-        # Parse JSON fields
-        if 'ml_analysis' in result and result['ml_analysis']:
+        risk_level = result['risk_level']
+        if risk_level is not None:
+            result['risk_level'] = RISK_LEVELS[risk_level]
+        
+        # BLOB, or TEXT in rows written before the switch; absent from summaries
+        ml_analysis = result.get('ml_analysis')
+        if ml_analysis:
             try:
-                result['ml_analysis'] = json.loads(result['ml_analysis'])
-            except:
+                result['ml_analysis'] = orjson.loads(ml_analysis)
+            except orjson.JSONDecodeError:
                 pass
         
-        if 'vitals_snapshot' in result and result['vitals_snapshot']:
+        return result
+    
+    
+    def _row_to_dict_alert(self, row):
+        """Convert an alerts Row to a dictionary, decoding severity and vitals_snapshot"""
+        result = dict(row)
+        
+        result['severity'] = RISK_LEVELS[result['severity']]
+        
+        vitals_snapshot = result['vitals_snapshot']
+        if vitals_snapshot:
             try:
-                result['vitals_snapshot'] = json.loads(result['vitals_snapshot'])
-            except:
+                result['vitals_snapshot'] = orjson.loads(vitals_snapshot)
+            except orjson.JSONDecodeError:
                 pass
         
         return result
     
     
     def close(self):
-        """Close database connection"""
-        self.conn.close()
+        """Flush pending writes and close database connections"""
+        for write_q in self._write_qs:
+            write_q.put(None)
+        for writer in self._writers:
+            writer.join()
+        while True:
+            try:
+                self._pool.get_nowait().close()
+            except queue.Empty:
+                break
         print("Database connection closed")
 
 
@@ -342,6 +789,7 @@ if __name__ == '__main__':
     # Store vitals
     print("Storing test vitals...")
     db.store_vitals(test_data)
+    db.flush()
     
     # Retrieve latest
     print("\nRetrieving latest vitals...")
@@ -0,0 +1,194 @@
+"""
+Numeric Kernels for the Health Predictor
+Scalar risk scoring compiled to native code with Numba when it is installed
+"""
+
+try:
+    from numba import njit
+except ImportError:  # Numba is optional - fall back to plain Python
+    def njit(*args, **kwargs):
+        if len(args) == 1 and callable(args[0]) and not kwargs:
+            return args[0]
+        return lambda func: func
+
+
+# Altitude impact factors: ALTITUDE_FACTORS[i] applies from ALTITUDE_BINS[i] metres
+# up to the next bin; below sea level the factor is 1.0
+ALTITUDE_BINS = (
+    0,     # Sea level
+    1000,  # Low altitude
+    2500,  # Moderate altitude
+    4000,  # High altitude
+    5500,  # Very high altitude
+    7000,  # Extreme altitude
+)
+ALTITUDE_FACTORS = (1.0, 1.05, 1.15, 1.30, 1.50, 1.75)
+
+# Risk level code (0 low, 1 moderate, 2 high) for every percentage in 0.1 steps:
+# above 30% is moderate, above 60% is high
+LEVEL_LUT = (0,) * 301 + (1,) * 300 + (2,) * 400
+
+
+@njit(cache=True, fastmath=True)
+def _risk_result(risk):
+    """Cap and round a risk percentage, and classify it with LEVEL_LUT"""
+    pct = round(min(100.0, risk), 1)
+    
+    return pct, LEVEL_LUT[int(pct * 10 + 0.5)]
+
+
+@njit(cache=True)
+def altitude_factor_kernel(altitude):
+    """
+    Altitude adjustment factor from ALTITUDE_BINS / ALTITUDE_FACTORS
+    
+    Compiled without fastmath, which would let LLVM assume no NaNs and
+    rewrite the NaN check below.
+    """
+    factor = 1.0
+    for i in range(len(ALTITUDE_BINS)):
+        if not altitude >= ALTITUDE_BINS[i]:  # Also stops on NaN
+            break
+        factor = ALTITUDE_FACTORS[i]
+    return factor
+
+
+@njit(cache=True, fastmath=True)
+def health_score_kernel(hr_severity, spo2_severity, temp_severity, bp_severity):
+    """Overall health score (0-100) from vital severities"""
+    score = 100
+    
+    # Deduct points for abnormal vitals
+    score -= hr_severity * 15
+    score -= spo2_severity * 20  # SpO2 is critical
+    score -= temp_severity * 10
+    score -= bp_severity * 15
+    
+    return max(0, min(100, score))
+
+
+@njit(cache=True, fastmath=True)
+def hypoxia_kernel(spo2, altitude_factor, heart_rate):
+    """Hypoxia - SpO2 (60% weight), altitude (30%), compensatory tachycardia (10%)"""
+    risk = 0.0
+    if spo2 < 88:
+        risk += 60
+    elif spo2 < 92:
+        risk += 30
+    elif spo2 < 95:
+        risk += 10
+    
+    risk += (altitude_factor - 1.0) * 30
+    
+    if heart_rate > 100:
+        risk += 10
+    
+    return _risk_result(risk)
+
+
+@njit(cache=True, fastmath=True)
+def altitude_sickness_kernel(altitude, spo2, heart_rate):
+    """Acute mountain sickness - altitude is the primary factor"""
+    risk = 0.0
+    if altitude > 5500:
+        risk += 50
+    elif altitude > 4000:
+        risk += 30
+    elif altitude > 2500:
+        risk += 10
+    
+    if spo2 < 90:
+        risk += 30
+    elif spo2 < 94:
+        risk += 15
+    
+    if heart_rate > 110:
+        risk += 20
+    elif heart_rate > 95:
+        risk += 10
+    
+    return _risk_result(risk)
+
+
+@njit(cache=True, fastmath=True)
+def cardiac_stress_kernel(heart_rate, systolic, diastolic):
+    """Cardiac stress - heart rate and blood pressure"""
+    risk = 0.0
+    if heart_rate > 120:
+        risk += 40
+    elif heart_rate > 100:
+        risk += 20
+    elif heart_rate < 50:
+        risk += 30  # Bradycardia
+    
+    if systolic > 140 or diastolic > 90:
+        risk += 30
+    elif systolic > 130 or diastolic > 85:
+        risk += 15
+    
+    if systolic < 90 or diastolic < 60:
+        risk += 30  # Hypotension
+    
+    return _risk_result(risk)
+
+
+@njit(cache=True, fastmath=True)
+def hypothermia_kernel(temperature, altitude):
+    """Hypothermia - temperature, with altitude increasing exposure"""
+    risk = 0.0
+    if temperature < 35:
+        risk += 70
+    elif temperature < 35.5:
+        risk += 40
+    elif temperature < 36:
+        risk += 20
+    
+    if altitude > 5000:
+        risk += 15
+    elif altitude > 3000:
+        risk += 5
+    
+    return _risk_result(risk)
+
+
+@njit(cache=True)
+def score_all(heart_rate, spo2, temperature, systolic, diastolic, altitude):
+    """
+    Score every risk in one pass, sharing the altitude factor
+    
+    Compiled without fastmath so the overall blend keeps Python's exact
+    floating point order (it is compared against the level thresholds).
+    
+    Returns:
+        tuple: (altitude_factor,
+                hypoxia, hypoxia_level, altitude_sickness, altitude_sickness_level,
+                cardiac_stress, cardiac_stress_level, hypothermia, hypothermia_level,
+                overall) - overall is unrounded
+    """
+    altitude_factor = altitude_factor_kernel(altitude)
+    
+    hypoxia, hypoxia_level = hypoxia_kernel(spo2, altitude_factor, heart_rate)
+    altitude_sickness, altitude_sickness_level = altitude_sickness_kernel(altitude, spo2, heart_rate)
+    cardiac, cardiac_level = cardiac_stress_kernel(heart_rate, systolic, diastolic)
+    hypothermia, hypothermia_level = hypothermia_kernel(temperature, altitude)
+    
+    # Weighted combination (60% max, 40% average - average * 0.4 folded to sum * 0.1)
+    max_risk = max(hypoxia, altitude_sickness, cardiac, hypothermia)
+    overall = max_risk * 0.6 + (hypoxia + altitude_sickness + cardiac + hypothermia) * 0.1
+    
+    return (
+        altitude_factor,
+        hypoxia, hypoxia_level, altitude_sickness, altitude_sickness_level,
+        cardiac, cardiac_level, hypothermia, hypothermia_level,
+        overall
+    )
+
+
+# Compile at import so the first request doesn't pay JIT latency
+altitude_factor_kernel(0.0)
+health_score_kernel(0, 0, 0, 0)
+hypoxia_kernel(96.0, 1.0, 72.0)
+altitude_sickness_kernel(0.0, 96.0, 72.0)
+cardiac_stress_kernel(72.0, 120.0, 80.0)
+hypothermia_kernel(36.8, 0.0)
+score_all(72.0, 96.0, 36.8, 120.0, 80.0, 0.0)
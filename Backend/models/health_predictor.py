@@ -4,9 +4,137 @@ Analyzes vital signs and predicts health risks for soldiers in high-altitude env
 """
 
 import numpy as np
-import json
-from datetime import datetime
-from models.health_predictor import predict_health
+import orjson
+import bisect
+import functools
+import logging
+import heapq
+from operator import itemgetter
+from typing import NamedTuple
+from utils.clock import now_iso
+from models._kernels import ALTITUDE_BINS, ALTITUDE_FACTORS, health_score_kernel, score_all
+
+logger = logging.getLogger(__name__)
+
+
+# Lookup tables for the vectorized batch path
+_BATCH_ALTITUDE_BINS = np.array(ALTITUDE_BINS)
+_BATCH_ALTITUDE_FACTORS = np.array((1.0,) + ALTITUDE_FACTORS)  # [0] is below sea level
+_BATCH_RISK_LEVELS = np.array(['low', 'moderate', 'high'])
+_BATCH_OVERALL_LEVELS = np.array(['low', 'moderate', 'high', 'critical'])
+
+# Vital statuses indexed by severity
+_STATUS = ('normal', 'warning', 'critical')
+
+# Risk levels indexed by the level codes the kernels return
+_RISK_LEVELS = ('low', 'moderate', 'high')
+_OVERALL_RISK_LEVELS = ('low', 'moderate', 'high', 'critical')
+_OVERALL_RISK_BINS = (30, 50, 70)  # Upper bounds (inclusive) of low, moderate, high
+
+# Display names of the risk predictions, in RiskPredictions field order
+_RISK_NAMES = ('Hypoxia', 'Altitude Sickness', 'Cardiac Stress', 'Hypothermia')
+
+# Recommendation templates - shared by every prediction, so treat them as read-only
+_REC_EVACUATE = {'priority': 'CRITICAL', 'action': 'Immediate medical evacuation required', 'icon': '🚨'}
+_REC_OXYGEN = {'priority': 'URGENT', 'action': 'Administer supplemental oxygen immediately', 'icon': '💨'}
+_REC_MONITOR_SPO2 = {'priority': 'HIGH', 'action': 'Monitor oxygen saturation closely, consider oxygen therapy', 'icon': '⚠️'}
+_REC_CARDIAC = {'priority': 'URGENT', 'action': 'Cardiac assessment required - possible arrhythmia', 'icon': '♥️'}
+_REC_HYPOTHERMIA = {'priority': 'URGENT', 'action': 'Hypothermia treatment - warm gradually, avoid extremes', 'icon': '🌡️'}
+_REC_HYPERTHERMIA = {'priority': 'URGENT', 'action': 'Hyperthermia treatment - cool down, hydrate', 'icon': '🌡️'}
+_REC_BLOOD_PRESSURE = {'priority': 'HIGH', 'action': 'Blood pressure management required', 'icon': '⚡'}
+_REC_ROUTINE = {'priority': 'ROUTINE', 'action': 'Continue standard monitoring protocol', 'icon': '✓'}
+
+
+# ═══════════════════════════════════════════════════
+# RESULT TYPES
+# ═══════════════════════════════════════════════════
+
+def _to_plain(value):
+    """Recursively convert result NamedTuples to dicts for JSON serialization"""
+    if isinstance(value, tuple) and hasattr(value, '_asdict'):
+        return {field: _to_plain(item) for field, item in zip(value._fields, value)}
+    if isinstance(value, list):
+        return [_to_plain(item) for item in value]
+    return value
+
+
+class Vitals(NamedTuple):
+    """Positional vital signs input for predict (defaults match the dict path)"""
+    heart_rate: float = 72
+    spo2: float = 96
+    temperature: float = 36.8
+    systolic: float = 120
+    diastolic: float = 80
+    altitude: float = 0
+
+
+_VITAL_KEYS = Vitals._fields
+_VITAL_DEFAULTS = tuple(Vitals())
+
+
+class VitalAssessment(NamedTuple):
+    """A single vital sign checked against its thresholds"""
+    value: float
+    status: str
+    severity: int
+    in_range: bool
+
+
+class BloodPressureAssessment(NamedTuple):
+    """Systolic and diastolic pressure assessed together"""
+    systolic: float
+    diastolic: float
+    status: str
+    severity: int
+    in_range: bool
+
+
+class VitalAssessments(NamedTuple):
+    heart_rate: VitalAssessment
+    spo2: VitalAssessment
+    temperature: VitalAssessment
+    blood_pressure: BloodPressureAssessment
+
+
+class RiskPrediction(NamedTuple):
+    """A predicted risk percentage with its level and model confidence"""
+    percentage: float
+    level: str
+    confidence: float
+
+
+class RiskPredictions(NamedTuple):
+    hypoxia: RiskPrediction
+    altitude_sickness: RiskPrediction
+    cardiac_stress: RiskPrediction
+    hypothermia: RiskPrediction
+
+
+class HealthResults(NamedTuple):
+    """Full analysis returned by HealthPredictor.predict"""
+    health_score: float
+    overall_risk_level: str
+    overall_risk_percentage: float
+    vital_assessments: VitalAssessments
+    risk_predictions: RiskPredictions
+    recommendations: list
+    health_trend: str
+    altitude_adjustment: float
+    predicted_at: str
+    model_version: str
+    
+    def to_dict(self):
+        """Nested dict form of the results, for JSON boundaries (API, Socket.IO, storage)"""
+        return _to_plain(self)
+
+
+def _round1(values):
+    """np.round(values, 1), with near-ties settled by round() so batch and scalar results agree"""
+    rounded = np.round(values, 1)
+    ties = np.abs(values * 10 % 1 - 0.5) < 1e-6
+    if ties.any():
+        rounded[ties] = [round(value, 1) for value in values[ties].tolist()]
+    return rounded
 
 
 class HealthPredictor:
@@ -25,7 +153,7 @@ class HealthPredictor:
     def __init__(self):
         """Initialize the model with thresholds and weights"""
         self.model_version = "1.0.0"
-        self.initialized_at = datetime.now().isoformat()
+        self.initialized_at = now_iso()
         
         # Normal ranges for vital signs
         self.thresholds = {
@@ -35,93 +163,99 @@ class HealthPredictor:
             'systolic': {'min': 90, 'max': 130, 'critical_low': 80, 'critical_high': 150},
             'diastolic': {'min': 60, 'max': 85, 'critical_low': 50, 'critical_high': 95},
         }
-        
-        # Altitude impact factors
-        self.altitude_factors = {
-            0: 1.0,      # Sea level
-            1000: 1.05,  # Low altitude
-            2500: 1.15,  # Moderate altitude
-            4000: 1.30,  # High altitude
-            5500: 1.50,  # Very high altitude
-            7000: 1.75,  # Extreme altitude
+        # (min, max, critical_low, critical_high) per vital for the assessors
+        self._thr = {
+            name: (t['min'], t['max'], t['critical_low'], t['critical_high'])
+            for name, t in self.thresholds.items()
         }
         
-        print(f"✅ HealthPredictor ML Model initialized (v{self.model_version})")
+        # Severity lookup tables for the batch path, for vitals with whole-number
+        # thresholds: (low-side LUT indexed by floor(value), high-side LUT indexed
+        # by ceil(value)). Against an integer t, value < t iff floor(value) < t and
+        # value > t iff ceil(value) > t, so the lookups match the comparisons exactly.
+        self._severity_luts = {}
+        for name, (mn, mx, cl, ch) in self._thr.items():
+            if all(isinstance(t, int) and 0 < t < 255 for t in (mn, mx, cl, ch)):
+                index = np.arange(256)
+                self._severity_luts[name] = (
+                    np.where(index < cl, 2, np.where(index < mn, 1, 0)).astype(np.uint8),
+                    np.where(index > ch, 2, np.where(index > mx, 1, 0)).astype(np.uint8)
+                )
+        
+        # Telemetry repeats the same readings often - memoize the numeric scoring per model
+        self._score_risks = functools.lru_cache(maxsize=4096)(self._compute_risks)
+        
+        logger.debug("HealthPredictor ML Model initialized (v%s)", self.model_version)
     
     def predict(self, vitals):
         """
         Main prediction function - processes vital signs and returns comprehensive analysis
         
         Args:
-            vitals (dict): Dictionary containing vital signs data
+            vitals (Vitals or dict): Vital signs, positionally or by name
             
         Returns:
-            dict: ML analysis results including risk levels, predictions, and recommendations
+            HealthResults: ML analysis results including risk levels, predictions, and
+                recommendations - call to_dict() before serializing
         """
         
-        # Extract vitals
-        heart_rate = vitals.get('heart_rate', 72)
-        spo2 = vitals.get('spo2', 96)
-        temperature = vitals.get('temperature', 36.8)
-        systolic = vitals.get('systolic', 120)
-        diastolic = vitals.get('diastolic', 80)
-        altitude = vitals.get('altitude', 0)
+        # Bind repeatedly used lookups to locals
+        assess = self._assess_value
+        thr = self._thr
+        risk_prediction = self._risk_prediction
+        
+        # Extract vitals - Vitals tuples unpack directly, dicts fall back to defaults
+        if not isinstance(vitals, Vitals):
+            vitals = map(vitals.get, _VITAL_KEYS, _VITAL_DEFAULTS)
+        heart_rate, spo2, temperature, systolic, diastolic, altitude = vitals
         
         # Calculate health status for each vital
-        hr_status = self._assess_vital('heart_rate', heart_rate)
-        spo2_status = self._assess_vital('spo2', spo2)
-        temp_status = self._assess_vital('temperature', temperature)
+        hr_status = assess(heart_rate, thr['heart_rate'])
+        spo2_status = assess(spo2, thr['spo2'])
+        temp_status = assess(temperature, thr['temperature'])
         bp_status = self._assess_blood_pressure(systolic, diastolic)
         
         # Calculate overall health score (0-100)
-        health_score = self._calculate_health_score(
-            hr_status, spo2_status, temp_status, bp_status
+        health_score = health_score_kernel(
+            hr_status.severity, spo2_status.severity,
+            temp_status.severity, bp_status.severity
         )
         
-        # Predict specific risks
-        hypoxia_risk = self._predict_hypoxia_risk(spo2, altitude, heart_rate)
-        altitude_sickness_risk = self._predict_altitude_sickness(altitude, spo2, heart_rate)
-        cardiac_stress_risk = self._predict_cardiac_stress(heart_rate, systolic, diastolic)
-        hypothermia_risk = self._predict_hypothermia(temperature, altitude)
-        
-        # Determine overall risk level
-        overall_risk = self._determine_overall_risk(
-            hypoxia_risk, altitude_sickness_risk, cardiac_stress_risk, hypothermia_risk
+        # Predict specific risks and the overall risk in one cached pass
+        (altitude_factor,
+         hypoxia, hypoxia_level, altitude_sickness, altitude_sickness_level,
+         cardiac_stress, cardiac_stress_level, hypothermia, hypothermia_level,
+         overall, overall_level) = self._score_risks(
+            heart_rate, spo2, temperature, systolic, diastolic, altitude
         )
+        overall_risk_level = _OVERALL_RISK_LEVELS[overall_level]
         
         # Generate medical recommendations
         recommendations = self._generate_recommendations(
-            overall_risk, hr_status, spo2_status, temp_status, bp_status
+            overall_risk_level, hr_status, spo2_status, temp_status, bp_status
         )
         
         # Predict health trend (improving/stable/deteriorating)
         trend = self._predict_trend(health_score)
         
         # Compile efficient results structure
-        results = {
-            'health_score': round(health_score, 1),
-            'overall_risk_level': overall_risk['level'],
-            'overall_risk_percentage': overall_risk['percentage'],
-            'vital_assessments': {
-                'heart_rate': hr_status,
-                'spo2': spo2_status,
-                'temperature': temp_status,
-                'blood_pressure': bp_status
-            },
-            'risk_predictions': {
-                'hypoxia': hypoxia_risk,
-                'altitude_sickness': altitude_sickness_risk,
-                'cardiac_stress': cardiac_stress_risk,
-                'hypothermia': hypothermia_risk
-            },
-            'recommendations': recommendations,
-            'health_trend': trend,
-            'altitude_adjustment': self._get_altitude_factor(altitude),
-            'predicted_at': datetime.now().isoformat(),
-            'model_version': self.model_version
-        }
-        
-        return results
+        return HealthResults(
+            health_score=round(health_score, 1),
+            overall_risk_level=overall_risk_level,
+            overall_risk_percentage=round(overall, 1),
+            vital_assessments=VitalAssessments(hr_status, spo2_status, temp_status, bp_status),
+            risk_predictions=RiskPredictions(
+                hypoxia=risk_prediction(hypoxia, hypoxia_level, 0.85),
+                altitude_sickness=risk_prediction(altitude_sickness, altitude_sickness_level, 0.80),
+                cardiac_stress=risk_prediction(cardiac_stress, cardiac_stress_level, 0.78),
+                hypothermia=risk_prediction(hypothermia, hypothermia_level, 0.82)
+            ),
+            recommendations=recommendations,
+            health_trend=trend,
+            altitude_adjustment=altitude_factor,
+            predicted_at=now_iso(),
+            model_version=self.model_version
+        )
     
     
     def predict_risk_level(self, vitals):
@@ -132,287 +266,195 @@ class HealthPredictor:
         full_prediction = self.predict(vitals)
         
         return {
-            'risk_level': full_prediction['overall_risk_level'],
-            'risk_percentage': full_prediction['overall_risk_percentage'],
-            'health_score': full_prediction['health_score'],
-            'top_risks': self._get_top_risks(full_prediction['risk_predictions'])
+            'risk_level': full_prediction.overall_risk_level,
+            'risk_percentage': full_prediction.overall_risk_percentage,
+            'health_score': full_prediction.health_score,
+            'top_risks': self._get_top_risks(full_prediction.risk_predictions)
         }
     
     
-    # ═══════════════════════════════════════════════════
-    # PRIVATE HELPER METHODS
-    # ═══════════════════════════════════════════════════
-    
-    def _assess_vital(self, vital_name, value):
-        """Assess a single vital sign against thresholds"""
-        thresholds = self.thresholds[vital_name]
+    def predict_batch(self, vitals_arrays):
+        """
+        Vectorized prediction over many samples at once
+        
+        Computes the same scores as predict() for every sample, without the
+        per-sample assessments and recommendations.
         
-        status = 'normal'
-        severity = 0
+        Args:
+            vitals_arrays (dict): Vital name -> array-like of samples; missing
+                vitals use the same defaults as predict()
+            
+        Returns:
+            dict: Arrays of health scores, overall risk and per-risk predictions
+        """
+        hr, spo2, temp, sys, dia, alt = np.broadcast_arrays(*(
+            np.atleast_1d(np.asarray(vitals_arrays.get(name, default), dtype=np.float64))
+            for name, default in (
+                ('heart_rate', 72), ('spo2', 96), ('temperature', 36.8),
+                ('systolic', 120), ('diastolic', 80), ('altitude', 0)
+            )
+        ))
+        
+        # Vital severities (0 normal, 1 warning, 2 critical) and health score
+        hr_sev = self._batch_severity('heart_rate', hr)
+        spo2_sev = self._batch_severity('spo2', spo2)
+        temp_sev = self._batch_severity('temperature', temp)
+        bp_sev = np.maximum(
+            self._batch_severity('systolic', sys), self._batch_severity('diastolic', dia)
+        )
         
-        if value < thresholds['critical_low'] or value > thresholds['critical_high']:
-            status = 'critical'
-            severity = 2
-        elif value < thresholds['min'] or value > thresholds['max']:
-            status = 'warning'
-            severity = 1
+        health_score = np.clip(
+            100 - hr_sev * 15 - spo2_sev * 20 - temp_sev * 10 - bp_sev * 15, 0, 100
+        )
         
-        return {
-            'value': value,
-            'status': status,
-            'severity': severity,
-            'in_range': status == 'normal'
+        # Hypoxia
+        altitude_factor = _BATCH_ALTITUDE_FACTORS[np.digitize(alt, _BATCH_ALTITUDE_BINS)]
+        hypoxia = np.where(spo2 < 88, 60, np.where(spo2 < 92, 30, np.where(spo2 < 95, 10, 0)))
+        hypoxia = hypoxia + (altitude_factor - 1.0) * 30
+        hypoxia += np.where(hr > 100, 10, 0)
+        
+        # Acute mountain sickness
+        altitude_sickness = np.where(alt > 5500, 50, np.where(alt > 4000, 30, np.where(alt > 2500, 10, 0)))
+        altitude_sickness += np.where(spo2 < 90, 30, np.where(spo2 < 94, 15, 0))
+        altitude_sickness += np.where(hr > 110, 20, np.where(hr > 95, 10, 0))
+        
+        # Cardiac stress
+        cardiac = np.where(hr > 120, 40, np.where(hr > 100, 20, np.where(hr < 50, 30, 0)))
+        cardiac += np.where((sys > 140) | (dia > 90), 30, np.where((sys > 130) | (dia > 85), 15, 0))
+        cardiac += np.where((sys < 90) | (dia < 60), 30, 0)
+        
+        # Hypothermia
+        hypothermia = np.where(temp < 35, 70, np.where(temp < 35.5, 40, np.where(temp < 36, 20, 0)))
+        hypothermia += np.where(alt > 5000, 15, np.where(alt > 3000, 5, 0))
+        
+        risks = {
+            'hypoxia': hypoxia,
+            'altitude_sickness': altitude_sickness,
+            'cardiac_stress': cardiac,
+            'hypothermia': hypothermia
         }
-    
-    
-    def _assess_blood_pressure(self, systolic, diastolic):
-        """Assess blood pressure (both systolic and diastolic)"""
-        sys_status = self._assess_vital('systolic', systolic)
-        dia_status = self._assess_vital('diastolic', diastolic)
+        risks = {name: _round1(np.minimum(risk, 100)) for name, risk in risks.items()}
         
-        # Overall BP status is the worse of the two
-        overall_status = 'critical' if (sys_status['status'] == 'critical' or dia_status['status'] == 'critical') else \
-                        'warning' if (sys_status['status'] == 'warning' or dia_status['status'] == 'warning') else \
-                        'normal'
+        # Overall risk - weighted combination (60% max, 40% average - folded to sum * 0.1)
+        max_risk = np.maximum.reduce(list(risks.values()))
+        total_risk = (risks['hypoxia'] + risks['altitude_sickness'] +
+                      risks['cardiac_stress'] + risks['hypothermia'])
+        overall = max_risk * 0.6 + total_risk * 0.1
         
         return {
-            'systolic': sys_status['value'],
-            'diastolic': dia_status['value'],
-            'status': overall_status,
-            'severity': max(sys_status['severity'], dia_status['severity']),
-            'in_range': sys_status['in_range'] and dia_status['in_range']
+            'health_score': health_score,
+            'overall_risk_level': _BATCH_OVERALL_LEVELS[np.digitize(overall, [30, 50, 70], right=True)],
+            'overall_risk_percentage': _round1(overall),
+            'risk_predictions': {
+                name: {
+                    'percentage': risk,
+                    'level': _BATCH_RISK_LEVELS[np.digitize(risk, [30, 60], right=True)]
+                }
+                for name, risk in risks.items()
+            },
+            'model_version': self.model_version
         }
     
     
-    def _calculate_health_score(self, hr_status, spo2_status, temp_status, bp_status):
-        """Calculate overall health score (0-100)"""
-        score = 100
+    # ═══════════════════════════════════════════════════
+    # PRIVATE HELPER METHODS
+    # ═══════════════════════════════════════════════════
+    
+    def _assess_value(self, value, thresholds):
+        """Assess a value against a (min, max, critical_low, critical_high) tuple"""
+        mn, mx, cl, ch = thresholds
         
-        # Deduct points for abnormal vitals
-        score -= hr_status['severity'] * 15
-        score -= spo2_status['severity'] * 20  # SpO2 is critical
-        score -= temp_status['severity'] * 10
-        score -= bp_status['severity'] * 15
+        severity = 2 if (value < cl or value > ch) else \
+                   1 if (value < mn or value > mx) else \
+                   0
         
-        return max(0, min(100, score))
+        return VitalAssessment(value, _STATUS[severity], severity, severity == 0)
     
     
-    def _predict_hypoxia_risk(self, spo2, altitude, heart_rate):
-        """Predict risk of hypoxia based on oxygen saturation and altitude"""
-        risk_score = 0
-        
-        # SpO2 contribution (60% weight)
-        if spo2 < 88:
-            risk_score += 60
-        elif spo2 < 92:
-            risk_score += 30
-        elif spo2 < 95:
-            risk_score += 10
+    def _batch_severity(self, vital_name, values):
+        """Vectorized _assess_value severity (0 normal, 1 warning, 2 critical)"""
+        luts = self._severity_luts.get(vital_name)
+        if luts is not None:
+            low_lut, high_lut = luts
+            low = np.clip(np.floor(values), 0, 255).astype(np.uint8)
+            high = np.clip(np.ceil(values), 0, 255).astype(np.uint8)
+            return np.maximum(low_lut[low], high_lut[high])
         
-        # Altitude contribution (30% weight)
-        altitude_factor = self._get_altitude_factor(altitude)
-        risk_score += (altitude_factor - 1.0) * 30
+        # Fractional thresholds (temperature) compare directly
+        mn, mx, cl, ch = self._thr[vital_name]
         
-        # Heart rate contribution (10% weight) - compensatory tachycardia
-        if heart_rate > 100:
-            risk_score += 10
+        critical = (values < cl) | (values > ch)
+        warning = (values < mn) | (values > mx)
         
-        risk_score = min(100, risk_score)
-        
-        return {
-            'percentage': round(risk_score, 1),
-            'level': 'high' if risk_score > 60 else 'moderate' if risk_score > 30 else 'low',
-            'confidence': 0.85
-        }
+        return np.where(critical, 2, np.where(warning, 1, 0))
     
     
-    def _predict_altitude_sickness(self, altitude, spo2, heart_rate):
-        """Predict risk of acute mountain sickness (AMS)"""
-        risk_score = 0
-        
-        # Altitude is the primary factor
-        if altitude > 5500:
-            risk_score += 50
-        elif altitude > 4000:
-            risk_score += 30
-        elif altitude > 2500:
-            risk_score += 10
-        
-        # Low SpO2 increases risk
-        if spo2 < 90:
-            risk_score += 30
-        elif spo2 < 94:
-            risk_score += 15
-        
-        # Elevated heart rate (compensatory)
-        if heart_rate > 110:
-            risk_score += 20
-        elif heart_rate > 95:
-            risk_score += 10
-        
-        risk_score = min(100, risk_score)
-        
-        return {
-            'percentage': round(risk_score, 1),
-            'level': 'high' if risk_score > 60 else 'moderate' if risk_score > 30 else 'low',
-            'confidence': 0.80
-        }
-    
-    
-    def _predict_cardiac_stress(self, heart_rate, systolic, diastolic):
-        """Predict cardiac stress level"""
-        risk_score = 0
-        
-        # Heart rate contribution
-        if heart_rate > 120:
-            risk_score += 40
-        elif heart_rate > 100:
-            risk_score += 20
-        elif heart_rate < 50:
-            risk_score += 30  # Bradycardia
-        
-        # Blood pressure contribution
-        if systolic > 140 or diastolic > 90:
-            risk_score += 30
-        elif systolic > 130 or diastolic > 85:
-            risk_score += 15
-        
-        # Hypotension
-        if systolic < 90 or diastolic < 60:
-            risk_score += 30
-        
-        risk_score = min(100, risk_score)
+    def _assess_blood_pressure(self, systolic, diastolic):
+        """Assess blood pressure (both systolic and diastolic)"""
+        thr = self._thr
+        sys_status = self._assess_value(systolic, thr['systolic'])
+        dia_status = self._assess_value(diastolic, thr['diastolic'])
         
-        return {
-            'percentage': round(risk_score, 1),
-            'level': 'high' if risk_score > 60 else 'moderate' if risk_score > 30 else 'low',
-            'confidence': 0.78
-        }
+        # Overall BP status is the worse of the two
+        severity = sys_status.severity if sys_status.severity > dia_status.severity else dia_status.severity
+        
+        return BloodPressureAssessment(
+            systolic=systolic,
+            diastolic=diastolic,
+            status=_STATUS[severity],
+            severity=severity,
+            in_range=severity == 0
+        )
     
     
-    def _predict_hypothermia(self, temperature, altitude):
-        """Predict hypothermia risk"""
-        risk_score = 0
-        
-        # Temperature is primary factor
-        if temperature < 35:
-            risk_score += 70
-        elif temperature < 35.5:
-            risk_score += 40
-        elif temperature < 36:
-            risk_score += 20
-        
-        # Altitude increases exposure risk
-        if altitude > 5000:
-            risk_score += 15
-        elif altitude > 3000:
-            risk_score += 5
-        
-        risk_score = min(100, risk_score)
+    def _compute_risks(self, heart_rate, spo2, temperature, systolic, diastolic, altitude):
+        """Score all risks for one set of readings (memoized as _score_risks, see score_all)"""
+        scores = score_all(
+            float(heart_rate), float(spo2), float(temperature),
+            float(systolic), float(diastolic), float(altitude)
+        )
         
-        return {
-            'percentage': round(risk_score, 1),
-            'level': 'high' if risk_score > 60 else 'moderate' if risk_score > 30 else 'low',
-            'confidence': 0.82
-        }
+        # Overall level code - bisect_left keeps each bound in the lower level (> 30 is moderate)
+        return scores + (bisect.bisect_left(_OVERALL_RISK_BINS, scores[-1]),)
     
     
-    def _determine_overall_risk(self, hypoxia, altitude_sickness, cardiac, hypothermia):
-        """Determine overall risk level from individual risk predictions"""
-        # Get highest risk percentage
-        max_risk = max(
-            hypoxia['percentage'],
-            altitude_sickness['percentage'],
-            cardiac['percentage'],
-            hypothermia['percentage']
-        )
-        
-        # Average of all risks
-        avg_risk = (
-            hypoxia['percentage'] +
-            altitude_sickness['percentage'] +
-            cardiac['percentage'] +
-            hypothermia['percentage']
-        ) / 4
-        
-        # Weighted combination (60% max, 40% average)
-        overall = max_risk * 0.6 + avg_risk * 0.4
-        
-        level = 'critical' if overall > 70 else \
-                'high' if overall > 50 else \
-                'moderate' if overall > 30 else \
-                'low'
-        
-        return {
-            'percentage': round(overall, 1),
-            'level': level
-        }
+    def _risk_prediction(self, percentage, level_code, confidence):
+        """Wrap a kernel risk percentage and level code with its model confidence"""
+        return RiskPrediction(percentage, _RISK_LEVELS[level_code], confidence)
     
     
-    def _generate_recommendations(self, overall_risk, hr_status, spo2_status, temp_status, bp_status):
+    def _generate_recommendations(self, overall_risk_level, hr_status, spo2_status, temp_status, bp_status):
         """Generate medical recommendations based on vital assessments"""
         recommendations = []
         
         # Critical recommendations
-        if overall_risk['level'] == 'critical':
-            recommendations.append({
-                'priority': 'CRITICAL',
-                'action': 'Immediate medical evacuation required',
-                'icon': '🚨'
-            })
+        if overall_risk_level == 'critical':
+            recommendations.append(_REC_EVACUATE)
         
         # SpO2 recommendations
-        if spo2_status['status'] == 'critical':
-            recommendations.append({
-                'priority': 'URGENT',
-                'action': 'Administer supplemental oxygen immediately',
-                'icon': '💨'
-            })
-        elif spo2_status['status'] == 'warning':
-            recommendations.append({
-                'priority': 'HIGH',
-                'action': 'Monitor oxygen saturation closely, consider oxygen therapy',
-                'icon': '⚠️'
-            })
+        if spo2_status.status == 'critical':
+            recommendations.append(_REC_OXYGEN)
+        elif spo2_status.status == 'warning':
+            recommendations.append(_REC_MONITOR_SPO2)
         
         # Heart rate recommendations
-        if hr_status['status'] == 'critical':
-            recommendations.append({
-                'priority': 'URGENT',
-                'action': 'Cardiac assessment required - possible arrhythmia',
-                'icon': '♥️'
-            })
+        if hr_status.status == 'critical':
+            recommendations.append(_REC_CARDIAC)
         
         # Temperature recommendations
-        if temp_status['status'] == 'critical':
-            if temp_status['value'] < 35.5:
-                recommendations.append({
-                    'priority': 'URGENT',
-                    'action': 'Hypothermia treatment - warm gradually, avoid extremes',
-                    'icon': '🌡️'
-                })
+        if temp_status.status == 'critical':
+            if temp_status.value < 35.5:
+                recommendations.append(_REC_HYPOTHERMIA)
             else:
-                recommendations.append({
-                    'priority': 'URGENT',
-                    'action': 'Hyperthermia treatment - cool down, hydrate',
-                    'icon': '🌡️'
-                })
+                recommendations.append(_REC_HYPERTHERMIA)
         
         # Blood pressure recommendations
-        if bp_status['status'] == 'critical':
-            recommendations.append({
-                'priority': 'HIGH',
-                'action': 'Blood pressure management required',
-                'icon': '⚡'
-            })
+        if bp_status.status == 'critical':
+            recommendations.append(_REC_BLOOD_PRESSURE)
         
         # General recommendations
-        if overall_risk['level'] in ['low', 'moderate'] and len(recommendations) == 0:
-            recommendations.append({
-                'priority': 'ROUTINE',
-                'action': 'Continue standard monitoring protocol',
-                'icon': '✓'
-            })
+        if overall_risk_level in ['low', 'moderate'] and len(recommendations) == 0:
+            recommendations.append(_REC_ROUTINE)
         
         return recommendations
     
@@ -430,27 +472,28 @@ class HealthPredictor:
             return 'deteriorating'
     
     
-    def _get_altitude_factor(self, altitude):
-        """Get altitude adjustment factor"""
-        for alt, factor in sorted(self.altitude_factors.items(), reverse=True):
-            if altitude >= alt:
-                return factor
-        return 1.0
-    
-    
     def _get_top_risks(self, risk_predictions):
         """Get top 3 risks by percentage"""
         risks = [
-            {'name': 'Hypoxia', **risk_predictions['hypoxia']},
-            {'name': 'Altitude Sickness', **risk_predictions['altitude_sickness']},
-            {'name': 'Cardiac Stress', **risk_predictions['cardiac_stress']},
-            {'name': 'Hypothermia', **risk_predictions['hypothermia']}
+            (risk.percentage, name, risk)
+            for name, risk in zip(_RISK_NAMES, risk_predictions)
         ]
         
-        # Sort by percentage
-        risks.sort(key=lambda x: x['percentage'], reverse=True)
+        # nlargest is stable, so ties keep report order as the old sort did
+        top = heapq.nlargest(3, risks, key=itemgetter(0))
         
-        return risks[:3]
+        return [{'name': name, **risk._asdict()} for _, name, risk in top]
+
+
+_default_model = None
+
+
+def predict_health(vitals):
+    """Run a full prediction with a shared, lazily created HealthPredictor"""
+    global _default_model
+    if _default_model is None:
+        _default_model = HealthPredictor()
+    return _default_model.predict(vitals)
 
 
 # ═══════════════════════════════════════════════════
@@ -474,7 +517,7 @@ if __name__ == '__main__':
         'altitude': 5400
     }
     result_1 = model.predict(test_vitals_1)
-    print(json.dumps(result_1, indent=2))
+    print(orjson.dumps(result_1.to_dict(), option=orjson.OPT_INDENT_2).decode())
     
     # Test case 2: Critical hypoxia
     print("\n" + "="*60)
@@ -489,4 +532,4 @@ if __name__ == '__main__':
         'altitude': 6200
     }
     result_2 = model.predict(test_vitals_2)
-    print(json.dumps(result_2, indent=2))
\ No newline at end of file
+    print(orjson.dumps(result_2.to_dict(), option=orjson.OPT_INDENT_2).decode())
\ No newline at end of file
@@ -0,0 +1,30 @@
+"""
+Clock Helpers for Elite Health Command
+Cheap ISO-8601 timestamps for hot request paths
+"""
+
+import time
+from datetime import datetime
+
+# (time.time() of the last format, formatted string) - swapped atomically
+_now_iso_cache = (0.0, '')
+
+
+def now_iso():
+    """
+    Current local time in ISO-8601 format with millisecond precision
+    
+    The string is re-formatted whenever the millisecond changes, including
+    when the wall clock steps backwards; callers that need a distinct value
+    per row should use datetime.now() directly.
+    """
+    global _now_iso_cache
+    
+    t = time.time()
+    cached_at, cached = _now_iso_cache
+    
+    if int(t * 1000) != int(cached_at * 1000):
+        cached = datetime.fromtimestamp(t).isoformat(timespec='milliseconds')
+        _now_iso_cache = (t, cached)
+    
+    return cached
@@ -194,12 +194,12 @@ class BackendAPIClient {
             console.log('📡 Server says:', data.message);
         });
 
-        // Real-time vitals updates
-        this.socket.on('vitals_update', (data) => {
-            console.log('📊 Received vitals update from backend');
+        // Real-time vitals updates (server batches them into one frame)
+        this.socket.on('vitals_update_batch', (batch) => {
+            console.log(`📊 Received ${batch.length} vitals update(s) from backend`);
             
             if (onVitalsUpdate) {
-                onVitalsUpdate(data);
+                batch.forEach((data) => onVitalsUpdate(data));
             }
         });
 